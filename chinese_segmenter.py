@@ -6,28 +6,61 @@
 """
 
 import argparse
+import mmap
+import multiprocessing
 import os
 import sys
 import re
-import jieba
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from collections import defaultdict
+from functools import lru_cache
+
+# 优先使用 Cython 加速的 jieba_fast（接口与 jieba 相同），未安装时回退到 jieba
+try:
+    import jieba_fast as jieba
+except ImportError:
+    import jieba
+
+# 匹配中文字符，包括基本汉字(4E00-9FFF)和扩展汉字区域(3400-4DBF, 20000-2A6DF等)
+# 字符类由 sre 编译为C层面的匹配器，逐字符判定无需经过Python解释器
+chinese_pattern = re.compile(r'[\u4e00-\u9fff\u3400-\u4dbf\U00020000-\U0002a6df]+')
+_chinese_fullmatch = chinese_pattern.fullmatch
+
+# 超过该大小的文件按换行边界分段解码，避免整个文件的字符串与分词状态同时驻留内存
+_LARGE_FILE_SIZE = 100 * 1024 * 1024
+_LARGE_FILE_CHUNK = 16 * 1024 * 1024
+
+# 支持的文本文件格式
+_EXTS = frozenset('.txt .md .csv .json .xml .html .htm'.split())
+_EXT_SUFFIXES = tuple(_EXTS)
+
+# 预读文件时每次读取的字节数
+_PREFETCH_BLOCK = 1024 * 1024
+
+# 写出结果时每次拼接的词汇数（中文词汇平均约十余字节，每块约16MB）
+_WRITE_BATCH_WORDS = 1 << 20
 
 def init_jieba():
     """初始化jieba分词器"""
-    # 启用并行分词，提高速度
-    jieba.enable_parallel(4)
+    # 不启用 jieba.enable_parallel：它每次分词都要 fork 进程且不兼容 jieba_fast
     # 关闭调试输出
     jieba.setLogLevel(20)  # 避免INFO级别的日志
 
+@lru_cache(maxsize=1 << 16)
 def is_chinese_word(word):
     """
     检查词汇是否为纯中文
-    使用正则表达式匹配中文字符（包括基本汉字和扩展汉字区域）
+    整个词汇交给预编译的字符类一次完成匹配（包括基本汉字和扩展汉字区域）
+    语料中的词频呈齐夫分布，高频词的判定结果会被缓存
     """
-    # 匹配中文字符，包括基本汉字(4E00-9FFF)和扩展汉字区域(3400-4DBF, 20000-2A6DF等)
-    chinese_pattern = re.compile(r'^[\u4e00-\u9fff\u3400-\u4dbf\U00020000-\U0002a6df]+$')
-    return bool(chinese_pattern.match(word))
+    return _chinese_fullmatch(word) is not None
+
+# 优先使用C扩展 _cjkfilter（需自行编译，见 _cjkfilter.c），其判定比缓存查询更快；未编译时使用上面的实现
+try:
+    from _cjkfilter import is_chinese_word
+except ImportError:
+    pass
 
 def ensure_output_dir(output_path):
     """确保输出目录存在"""
@@ -35,24 +68,57 @@ def ensure_output_dir(output_path):
     output_path.mkdir(parents=True, exist_ok=True)
     return output_path
 
-def get_unique_output_path(output_dir, base_filename):
+def get_unique_output_path(output_dir_path, base_filename):
     """
     生成唯一的输出文件路径，避免覆盖现有文件
+    文件名附加时间戳，并以独占方式创建该文件以占用路径，返回 (路径, 文件描述符)
+    output_dir_path: 已由 ensure_output_dir 创建的输出目录 Path
     """
-    output_dir = Path(output_dir)
     base_name = Path(base_filename).stem
     extension = ".txt"
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
     
-    # 初始尝试使用基本文件名
-    output_path = output_dir / f"{base_name}_segmented{extension}"
+    output_path = output_dir_path / f"{base_name}_segmented_{timestamp}{extension}"
     
-    # 如果文件已存在，添加数字后缀
+    # 同一秒内生成重名文件时，添加数字后缀
     counter = 1
-    while output_path.exists():
-        output_path = output_dir / f"{base_name}_segmented_{counter}{extension}"
-        counter += 1
-    
-    return output_path
+    while True:
+        try:
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            return output_path, fd
+        except FileExistsError:
+            output_path = output_dir_path / f"{base_name}_segmented_{timestamp}_{counter}{extension}"
+            counter += 1
+
+def write_words(output_path, fd, words):
+    """
+    将词汇按Unicode顺序写入 get_unique_output_path 预留的文件，每行一个
+    UTF-8字节序与Unicode码位顺序一致，预先编码后按字节排序，再按块拼接后整块写入
+    写入失败时删除该文件，避免留下空的或不完整的结果文件
+    """
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            encoded_words = [word.encode('utf-8') for word in words]
+            encoded_words.sort()
+            for start in range(0, len(encoded_words), _WRITE_BATCH_WORDS):
+                f.write(b'\n'.join(encoded_words[start:start + _WRITE_BATCH_WORDS]))
+                f.write(b'\n')
+    except BaseException:
+        os.unlink(output_path)
+        raise
+
+def _paragraph_chunks(content, target=65536):
+    """
+    将文本切分为约 target 个字符的片段，每段在换行处结束
+    jieba 不会跨越换行切词，因此分块不影响分词结果
+    """
+    start = 0
+    length = len(content)
+    while start < length:
+        end = content.find('\n', start + target)
+        end = length if end == -1 else end + 1
+        yield content[start:end]
+        start = end
 
 def extract_chinese_words(content):
     """
@@ -61,64 +127,47 @@ def extract_chinese_words(content):
     if not content:
         return set()
     
-    # 使用jieba进行中文分词
-    words = jieba.cut(content)
-    
-    # 过滤非中文词汇并去重
-    unique_words = set()
-    for word in words:
-        word = word.strip()
-        # 过滤空字符串和非中文词汇
-        if word and is_chinese_word(word):
-            unique_words.add(word)
-    
-    return unique_words
+    # 按段落分块送入jieba分词，先对全部分词结果去重
+    tokens = set()
+    for chunk in _paragraph_chunks(content):
+        tokens.update(jieba.cut(chunk))
+    
+    # 再对去重后的词汇批量过滤非中文词汇，每种词汇只判定一次
+    # jieba 将空白字符单独切分为词，空白词与空字符串均无法通过中文匹配，无需逐词 strip；
+    # filter 与 set 在C层面循环；判定函数在编译了C扩展时也在C层面完成，
+    # 否则缓存未命中时仍会执行Python实现。词汇已先去重，同一分块内几乎每次都是未命中，
+    # lru_cache 只在不同分块和不同文件之间重复出现的词汇上起作用
+    return set(filter(is_chinese_word, tokens))
 
-def process_file(file_path, output_dir="raw"):
+def process_file(file_path, output_dir_path):
     """
     处理单个文件：读取、分词、过滤非中文、去重
+    output_dir_path: 已由 ensure_output_dir 创建的输出目录 Path
     """
     try:
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-        
-        if not content:
-            print(f"警告: 文件 {file_path} 为空，跳过处理")
-            return None
+        _, unique_words, message = _tokenize_file(file_path)
         
-        # 提取中文词汇
-        unique_words = extract_chinese_words(content)
-        
-        if not unique_words:
-            print(f"警告: 文件 {file_path} 没有有效的中文词汇，跳过处理")
+        if unique_words is None:
+            print(message)
             return None
         
-        # 确保输出目录存在
-        output_dir_path = ensure_output_dir(output_dir)
-        
         # 生成唯一的输出文件名
         input_path = Path(file_path)
-        output_path = get_unique_output_path(output_dir, input_path.name)
+        output_path, fd = get_unique_output_path(output_dir_path, input_path.name)
         
         # 写入结果
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for word in sorted(unique_words):  # 按Unicode顺序排序
-                f.write(word + '\n')
+        write_words(output_path, fd, unique_words)
         
         print(f"成功处理: {file_path} -> {output_path}")
         print(f"  提取中文词汇数: {len(unique_words)}")
         
         return output_path, len(unique_words), unique_words
         
-    except UnicodeDecodeError:
-        print(f"错误: 文件 {file_path} 编码不是UTF-8，请检查文件编码")
-        return None
     except Exception as e:
         print(f"错误: 处理文件 {file_path} 时发生异常: {str(e)}")
         return None
 
-def process_directory(directory_path, output_dir="raw", recursive=False, merge_output=True):
+def process_directory(directory_path, output_dir_path, recursive=False, merge_output=True):
     """
     处理目录中的所有文本文件
     merge_output: 是否合并输出到单个文件
@@ -126,19 +175,21 @@ def process_directory(directory_path, output_dir="raw", recursive=False, merge_o
     directory_path = Path(directory_path)
     text_files = []
     
-    # 支持多种文本文件格式
-    extensions = ['.txt', '.md', '.csv', '.json', '.xml', '.html', '.htm']
-    
-    # 收集文本文件
-    if recursive:
-        for ext in extensions:
-            text_files.extend(directory_path.glob(f"**/*{ext}"))
-    else:
-        for ext in extensions:
-            text_files.extend(directory_path.glob(f"*{ext}"))
-    
-    # 去重并确保是文件
-    text_files = list(set([f for f in text_files if f.is_file()]))
+    # 单次遍历收集文本文件，在内存中比较扩展名；scandir 不会重复返回同一文件，无需去重
+    pending_dirs = [directory_path]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending_dirs.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(_EXT_SUFFIXES):
+                        text_files.append(Path(entry.path))
+        except OSError as e:
+            # 无法读取的目录（如权限不足）跳过，继续处理其余目录
+            print(f"警告: 无法读取目录 {current_dir}，跳过处理: {str(e)}")
     
     if not text_files:
         print(f"警告: 在目录 {directory_path} 中未找到支持的文本文件")
@@ -146,19 +197,67 @@ def process_directory(directory_path, output_dir="raw", recursive=False, merge_o
     
     print(f"找到 {len(text_files)} 个文本文件")
     
-    # 确保输出目录存在
-    ensure_output_dir(output_dir)
-    
     if merge_output:
         # 合并模式：将所有文件的分词结果合并到一个文件
-        return process_directory_merged(directory_path, text_files, output_dir)
+        return process_directory_merged(directory_path, text_files, output_dir_path)
     else:
         # 分散模式：每个文件单独输出
-        return process_directory_separate(text_files, output_dir)
+        return process_directory_separate(text_files, output_dir_path)
 
-def process_directory_merged(directory_path, text_files, output_dir):
+def _read_text_chunks(file_path):
+    """
+    以只读 mmap 映射文件并直接从映射内存解码为文本，避免 f.read() 额外复制一份
+    大文件按换行边界分段解码，逐段返回
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            if size <= _LARGE_FILE_SIZE:
+                yield str(view, 'utf-8')
+                return
+            
+            start = 0
+            while start < size:
+                # 在换行处切分，保证不会截断多字节字符
+                end = mm.find(b'\n', start + _LARGE_FILE_CHUNK)
+                end = size if end == -1 else end + 1
+                yield str(view[start:end], 'utf-8')
+                start = end
+
+def _tokenize_file(file_path):
+    """
+    读取单个文件并提取中文词汇，供进程池中的工作进程调用
+    返回 (文件路径, 中文词汇集合, 提示信息)，跳过或出错时词汇集合为 None
+    """
+    try:
+        unique_words = set()
+        is_empty = True
+        for content in _read_text_chunks(file_path):
+            if not content or content.isspace():
+                continue
+            is_empty = False
+            # 提取中文词汇
+            unique_words.update(extract_chinese_words(content))
+        
+        if is_empty:
+            return file_path, None, f"警告: 文件 {file_path} 为空，跳过处理"
+        
+        if not unique_words:
+            return file_path, None, f"警告: 文件 {file_path} 没有有效的中文词汇，跳过处理"
+        
+        return file_path, unique_words, None
+        
+    except UnicodeDecodeError:
+        return file_path, None, f"错误: 文件 {file_path} 编码不是UTF-8，跳过处理"
+    except Exception as e:
+        return file_path, None, f"错误: 处理文件 {file_path} 时发生异常: {str(e)}"
+
+def process_directory_merged(directory_path, text_files, output_dir_path):
     """
     处理目录并将所有结果合并到单个文件
+    以文件为单位分发到多个进程并行分词，每个进程保持单线程
     """
     all_unique_words = set()
     processed_files = {}
@@ -166,21 +265,21 @@ def process_directory_merged(directory_path, text_files, output_dir):
     
     print("启用合并输出模式...")
     
-    for file_path in text_files:
-        try:
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            if not content:
-                print(f"警告: 文件 {file_path} 为空，跳过处理")
-                continue
-            
-            # 提取中文词汇
-            unique_words = extract_chinese_words(content)
-            
-            if not unique_words:
-                print(f"警告: 文件 {file_path} 没有有效的中文词汇，跳过处理")
+    processes = min(os.cpu_count() or 1, len(text_files))
+    # 文件数较多时批量分发以减少进程间通信，文件较少时逐个分发以均衡负载
+    chunksize = max(1, len(text_files) // (processes * 4))
+    
+    # Linux 上使用 fork 启动工作进程，子进程通过写时复制共享主进程已加载的词典，无需各自重新加载；
+    # 其他平台（macOS 上 fork 不安全）使用默认启动方式
+    if sys.platform.startswith('linux'):
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    
+    with context.Pool(processes, initializer=init_jieba) as pool:
+        for file_path, unique_words, message in pool.imap_unordered(_tokenize_file, text_files, chunksize):
+            if unique_words is None:
+                print(message)
                 continue
             
             # 合并到总集合中
@@ -192,31 +291,16 @@ def process_directory_merged(directory_path, text_files, output_dir):
             # 跟踪重名文件
             filename = file_path.name
             processed_files[filename] = processed_files.get(filename, 0) + 1
-            
-        except UnicodeDecodeError:
-            print(f"错误: 文件 {file_path} 编码不是UTF-8，跳过处理")
-        except Exception as e:
-            print(f"错误: 处理文件 {file_path} 时发生异常: {str(e)}")
     
     if not all_unique_words:
         print("错误: 没有成功提取任何中文词汇")
         return []
     
     # 生成合并输出文件名
-    dir_name = directory_path.name
-    output_filename = f"{dir_name}_merged_segmented.txt"
-    output_path = Path(output_dir) / output_filename
-    
-    # 如果文件已存在，添加数字后缀
-    counter = 1
-    while output_path.exists():
-        output_path = Path(output_dir) / f"{dir_name}_merged_segmented_{counter}.txt"
-        counter += 1
+    output_path, fd = get_unique_output_path(output_dir_path, f"{directory_path.name}_merged.txt")
     
     # 写入合并结果
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for word in sorted(all_unique_words):  # 按Unicode顺序排序
-            f.write(word + '\n')
+    write_words(output_path, fd, all_unique_words)
     
     print(f"\n合并处理完成！")
     print(f"成功处理文件数: {successful_files}/{len(text_files)}")
@@ -232,23 +316,45 @@ def process_directory_merged(directory_path, text_files, output_dir):
     
     return [(output_path, len(all_unique_words), all_unique_words)]
 
-def process_directory_separate(text_files, output_dir):
+def _prefetch_file(file_path):
+    """
+    读取整个文件以载入系统页缓存，之后 mmap 映射时无需等待磁盘
+    读取期间释放GIL，可与主线程的分词同时进行；出错时忽略，由正式处理时报告
+    """
+    buffer = bytearray(_PREFETCH_BLOCK)
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
+            while f.readinto(buffer):
+                pass
+    except OSError:
+        pass
+
+def process_directory_separate(text_files, output_dir_path):
     """
     处理目录但每个文件单独输出（保留原功能）
+    分词当前文件的同时，由后台线程预读下一个文件
     """
     results = []
     processed_files = {}  # 跟踪已处理的文件名，避免重复
-    
-    for file_path in text_files:
-        # 检查是否已经处理过同名文件
-        filename = file_path.name
-        if filename in processed_files:
-            print(f"注意: 发现重名文件 {file_path}，将使用不同文件名保存")
-        
-        result = process_file(file_path, output_dir)
-        if result:
-            results.append(result)
-            processed_files[filename] = processed_files.get(filename, 0) + 1
+    prefetch = None
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for index, file_path in enumerate(text_files):
+            # 等待当前文件预读完成后再预读下一个文件，保持一个文件的预读深度
+            if prefetch is not None:
+                prefetch.result()
+            if index + 1 < len(text_files):
+                prefetch = executor.submit(_prefetch_file, text_files[index + 1])
+            
+            # 检查是否已经处理过同名文件
+            filename = file_path.name
+            if filename in processed_files:
+                print(f"注意: 发现重名文件 {file_path}，将使用不同文件名保存")
+            
+            result = process_file(file_path, output_dir_path)
+            if result:
+                results.append(result)
+                processed_files[filename] = processed_files.get(filename, 0) + 1
     
     # 输出重名文件统计
     duplicate_files = {name: count for name, count in processed_files.items() if count > 1}
@@ -316,14 +422,18 @@ def main():
         print(f"错误: 路径 '{args.path}' 不存在")
         sys.exit(1)
     
-    # 初始化jieba
+    # 初始化jieba，并在主进程中预先加载词典
     init_jieba()
+    jieba.initialize()
+    
+    # 确保输出目录存在，之后统一传递该 Path
+    output_dir_path = ensure_output_dir(args.output_dir)
     
     # 处理路径
     if os.path.isfile(args.path):
         # 处理单个文件
         print(f"开始处理文件: {args.path}")
-        result = process_file(args.path, args.output_dir)
+        result = process_file(args.path, output_dir_path)
         if not result:
             sys.exit(1)
             
@@ -340,7 +450,7 @@ def main():
         else:
             print("启用分散输出模式（每个文件单独输出）")
         
-        results = process_directory(args.path, args.output_dir, args.recursive, merge_output)
+        results = process_directory(args.path, output_dir_path, args.recursive, merge_output)
         
         if results:
             if merge_output: